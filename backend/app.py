@@ -5,16 +5,26 @@ Backend directly accesses camera and detects posture
 
 import cv2
 import numpy as np
+import base64
+import binascii
 import json
-from flask import Flask, request, jsonify
+import orjson
+from flask import Flask, request
 from flask_cors import CORS
+from waitress import serve
 from posture_detector import PostureDetector
 import logging
+import multiprocessing
+import queue
 import threading
 import time
+from collections import namedtuple
+from concurrent.futures import Future
 import tkinter as tk
 import random
 import ctypes
+import atexit
+import os
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -24,74 +34,169 @@ logger = logging.getLogger(__name__)
 app = Flask(__name__)
 CORS(app)
 
-# Initialize detector once at startup
+# Run the detector on every Nth captured frame; the rest are read and dropped
+DETECT_EVERY_N = 3
+
+# Rate at which each frame source feeds its detector: the camera loop's ~30 fps
+# after decimation, and the extension's /detect timer (src/monitor.js)
+CAMERA_DETECT_FPS = 30 / DETECT_EVERY_N
+UPLOAD_DETECT_FPS = 10
+
+# Opt-in BlazeFace model for the MediaPipe Tasks face detector (GPU delegate
+# where supported). Only used when USE_TASKS_FACE_DETECTOR is set and the file
+# is present; its boxes are rescaled to match the legacy full-range model
+USE_TASKS_FACE_DETECTOR = False
+FACE_DETECTOR_MODEL = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                   'models', 'blaze_face_short_range.tflite')
+
+# Optional FaceLandmarker bundle for blink landmarks via the Tasks API in
+# LIVE_STREAM mode; the legacy Face Mesh solution is used when it's absent
+FACE_LANDMARKER_MODEL = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                     'models', 'face_landmarker.task')
+
+# Frames to discard when capture resumes (covers DirectShow's internal queue)
+STALE_FRAME_DRAIN = 4
+
+# Largest /detect upload accepted, and how many pooled buffers hold them
+MAX_FRAME_BYTES = 2 * 1024 * 1024
+UPLOAD_BUFFERS = 4
+
+# Werkzeug rejects larger bodies with 413 before buffering them (this also
+# bounds the base64 JSON fallback, which is ~4/3 the size of the JPEG)
+app.config['MAX_CONTENT_LENGTH'] = MAX_FRAME_BYTES
+
+# Prefixed to /status ETags so a client still caching a response from an
+# earlier server run (whose version counter restarted at 0) can't get a 304
+BOOT_ID = os.urandom(4).hex()
+
+# Waitress worker threads. A /detect request holds its thread while it waits
+# for the detect worker, so keep enough spare that /status polls never queue
+SERVER_THREADS = 8
+
+# /detect frames are decoded at half size when that still leaves this many
+# columns (the detector's inference width), letting libjpeg scale in the DCT
+DECODE_MIN_WIDTH = 320
+
+# Seconds to wait for the detection process to build its detector
+DETECTOR_START_TIMEOUT = 30.0
+
+# Minimum seconds between posture popups
+POPUP_MIN_INTERVAL = 5.0
+
+# Each process builds its own detector with init_detector(): the detection
+# process for the camera loop, the server process for /detect
 detector = None
-is_detecting = False
-detection_thread = None
 
-# Store latest detection state
-current_status = {
+# /detect handlers queue frames for one worker thread that owns the
+# server-side detector (MediaPipe graphs aren't thread-safe); started lazily
+_detect_queue = queue.Queue()
+_detect_worker = None
+_detect_worker_lock = threading.Lock()
+
+# Detection runs in its own process so OpenCV/MediaPipe work does not
+# contend with Flask for the GIL. These are created in __main__.
+detection_process = None
+run_event = None
+detector_ready = None
+
+# Alert flags in a fixed order. Shared state holds them as a plain tuple
+# (a namedtuple class would have to be importable in the Manager process);
+# the JSON dict is only built when /status is read.
+Alerts = namedtuple('Alerts', 'no_face warning bad low_blink serious_eye_strain')
+ALERT_KEYS = ('no_face_alert', 'warning_alert', 'bad_alert', 'low_blink_rate_alert', 'serious_eye_strain')
+NO_ALERTS = Alerts(False, False, False, False, False)
+
+# Reusable /detect upload buffers, filled in __main__ so the detection and
+# Manager processes don't allocate them; a request blocks if all are in use
+_upload_pool = queue.Queue()
+
+# Initial detection state; the live copy is a Manager dict shared with the
+# detection process
+DEFAULT_STATUS = {
     'posture_status': 'good',
     'face_size': None,
     'is_face_detected': False,
-    'alerts': {'bad_alert': False, 'warning_alert': False, 'no_face_alert': False, 'low_blink_rate_alert': False}
+    'alerts_tuple': tuple(NO_ALERTS),
+    'version': 0  # bumped by the detection process whenever the state changes
 }
+current_status = None
 
-def _show_fullscreen_block(message, duration_ms):
-    """
-    Show a fullscreen OpenCV window with a message and block for duration_ms.
-    Modern, calm mental-health / healthcare styling.
-    """
-    # Get screen size (Windows)
-    user32 = ctypes.windll.user32
-    screen_w = user32.GetSystemMetrics(0)
-    screen_h = user32.GetSystemMetrics(1)
+# Static fullscreen-block backgrounds, keyed by (screen_w, screen_h)
+_BLOCK_BG_CACHE = {}
 
-    # Create a soft pastel background
-    img = np.zeros((screen_h, screen_w, 3), dtype=np.uint8)
-    img[:] = (245, 240, 255)  # light pastel lavender (BGR)
+# Fixed fullscreen-block title and footer; their widths are measured once
+_TITLE_TEXT = "Reminder to Stay Kind to Your Body"
+_TITLE_SCALE = 1.4
+_TITLE_THICKNESS = 2
+(_TITLE_W, _), _ = cv2.getTextSize(
+    _TITLE_TEXT, cv2.FONT_HERSHEY_SIMPLEX, _TITLE_SCALE, _TITLE_THICKNESS
+)
 
-    # "Card" area in the center
+_INFO_TEXT = "This screen will close automatically."
+_INFO_SCALE = 0.9
+_INFO_THICKNESS = 2
+(_INFO_W, _), _ = cv2.getTextSize(
+    _INFO_TEXT, cv2.FONT_HERSHEY_SIMPLEX, _INFO_SCALE, _INFO_THICKNESS
+)
+
+
+def _card_rect(screen_w, screen_h):
+    """Return (x1, y1, x2, y2) of the centered "card" area"""
     card_margin_x = int(screen_w * 0.08)
     card_margin_y_top = int(screen_h * 0.12)
     card_margin_y_bottom = int(screen_h * 0.14)
 
-    card_x1 = card_margin_x
-    card_y1 = card_margin_y_top
-    card_x2 = screen_w - card_margin_x
-    card_y2 = screen_h - card_margin_y_bottom
+    return (card_margin_x, card_margin_y_top,
+            screen_w - card_margin_x, screen_h - card_margin_y_bottom)
+
+
+def _block_background(screen_w, screen_h):
+    """
+    Return the static part of the fullscreen block (background, shadow,
+    card, accent bar). Built once per screen size; callers must copy it.
+    """
+    key = (screen_w, screen_h)
+    if key in _BLOCK_BG_CACHE:
+        return _BLOCK_BG_CACHE[key]
+
+    # Create a soft pastel background (light pastel lavender, BGR) in one pass
+    img = np.full((screen_h, screen_w, 3), (245, 240, 255), dtype=np.uint8)
+
+    # "Card" area in the center
+    card_x1, card_y1, card_x2, card_y2 = _card_rect(screen_w, screen_h)
+
+    # The rectangles below are solid and axis-aligned, so plain slice fills
+    # (end-inclusive, like cv2.rectangle) replace the generic rasterizer
 
     # Subtle drop shadow behind card
     shadow_offset = 10
-    cv2.rectangle(
-        img,
-        (card_x1 + shadow_offset, card_y1 + shadow_offset),
-        (card_x2 + shadow_offset, card_y2 + shadow_offset),
-        (225, 220, 240),  # soft shadow color
-        thickness=-1,
-        lineType=cv2.LINE_AA
-    )
+    img[card_y1 + shadow_offset:card_y2 + shadow_offset + 1,
+        card_x1 + shadow_offset:card_x2 + shadow_offset + 1] = (225, 220, 240)  # soft shadow color
 
     # Card itself (white)
-    cv2.rectangle(
-        img,
-        (card_x1, card_y1),
-        (card_x2, card_y2),
-        (255, 255, 255),
-        thickness=-1,
-        lineType=cv2.LINE_AA
-    )
+    img[card_y1:card_y2 + 1, card_x1:card_x2 + 1] = (255, 255, 255)
 
     # Accent bar at top of card
     accent_height = 8
-    cv2.rectangle(
-        img,
-        (card_x1, card_y1),
-        (card_x2, card_y1 + accent_height),
-        (210, 180, 255),  # soft purple accent
-        thickness=-1,
-        lineType=cv2.LINE_AA
-    )
+    img[card_y1:card_y1 + accent_height + 1, card_x1:card_x2 + 1] = (210, 180, 255)  # soft purple accent
+
+    _BLOCK_BG_CACHE[key] = img
+    return img
+
+
+def _show_fullscreen_block(message, duration_ms):
+    """
+    Show a fullscreen OpenCV window with a message and block for duration_ms.
+    Modern, calm mental-health / healthcare styling.
+    """
+    # Get screen size (Windows)
+    user32 = ctypes.windll.user32
+    screen_w = user32.GetSystemMetrics(0)
+    screen_h = user32.GetSystemMetrics(1)
+
+    # Start from the cached static background; only the text is drawn per call
+    img = _block_background(screen_w, screen_h).copy()
+    card_x1, card_y1, card_x2, card_y2 = _card_rect(screen_w, screen_h)
 
     # Helper to draw multi-line text
     def put_multiline_text(img, text, org, line_height=40, scale=1.2,
@@ -101,9 +206,6 @@ def _show_fullscreen_block(message, duration_ms):
             if not line.strip():
                 y += line_height
                 continue
-            (text_w, text_h), _ = cv2.getTextSize(
-                line, cv2.FONT_HERSHEY_SIMPLEX, scale, thickness
-            )
             cv2.putText(
                 img,
                 line,
@@ -117,23 +219,17 @@ def _show_fullscreen_block(message, duration_ms):
             y += line_height
 
     # Title (centered horizontally)
-    title_text = "Reminder to Stay Kind to Your Body"
-    title_scale = 1.4
-    title_thickness = 2
-    (title_w, title_h), _ = cv2.getTextSize(
-        title_text, cv2.FONT_HERSHEY_SIMPLEX, title_scale, title_thickness
-    )
-    title_x = card_x1 + (card_x2 - card_x1 - title_w) // 2
+    title_x = card_x1 + (card_x2 - card_x1 - _TITLE_W) // 2
     title_y = card_y1 + 80
 
     cv2.putText(
         img,
-        title_text,
+        _TITLE_TEXT,
         (title_x, title_y),
         cv2.FONT_HERSHEY_SIMPLEX,
-        title_scale,
+        _TITLE_SCALE,
         (170, 120, 255),  # soft purple
-        title_thickness,
+        _TITLE_THICKNESS,
         cv2.LINE_AA
     )
 
@@ -151,40 +247,40 @@ def _show_fullscreen_block(message, duration_ms):
     )
 
     # Info text at bottom of card
-    info_text = "This screen will close automatically."
-    info_scale = 0.9
-    info_thickness = 2
-    (info_w, info_h), _ = cv2.getTextSize(
-        info_text, cv2.FONT_HERSHEY_SIMPLEX, info_scale, info_thickness
-    )
-    info_x = card_x1 + (card_x2 - card_x1 - info_w) // 2
+    info_x = card_x1 + (card_x2 - card_x1 - _INFO_W) // 2
     info_y = card_y2 - 40
 
     cv2.putText(
         img,
-        info_text,
+        _INFO_TEXT,
         (info_x, info_y),
         cv2.FONT_HERSHEY_SIMPLEX,
-        info_scale,
+        _INFO_SCALE,
         (150, 150, 170),  # soft muted gray
-        info_thickness,
+        _INFO_THICKNESS,
         cv2.LINE_AA
     )
 
+    # The window is created once and afterwards only shown and hidden,
+    # instead of a create/fullscreen/destroy round trip per alert
     window_name = "Eye Break"
-    cv2.namedWindow(window_name, cv2.WND_PROP_FULLSCREEN)
-    cv2.setWindowProperty(window_name, cv2.WND_PROP_FULLSCREEN, cv2.WINDOW_FULLSCREEN)
+    if not user32.FindWindowW(None, window_name):
+        cv2.namedWindow(window_name, cv2.WND_PROP_FULLSCREEN)
+        cv2.setWindowProperty(window_name, cv2.WND_PROP_FULLSCREEN, cv2.WINDOW_FULLSCREEN)
     cv2.imshow(window_name, img)
-    
+
+    hwnd = None
     try:
-        user32 = ctypes.windll.user32
         HWND_TOPMOST = -1
         SWP_NOSIZE = 0x0001
         SWP_NOMOVE = 0x0002
+        SW_SHOW = 5
 
         # Find the OpenCV window by its title
         hwnd = user32.FindWindowW(None, window_name)
         if hwnd:
+            # Unhide it if a previous block hid it
+            user32.ShowWindow(hwnd, SW_SHOW)
             # Make it topmost
             user32.SetWindowPos(hwnd, HWND_TOPMOST, 0, 0, 0, 0,
                                 SWP_NOMOVE | SWP_NOSIZE)
@@ -193,10 +289,47 @@ def _show_fullscreen_block(message, duration_ms):
     except Exception as e:
         print(f"Could not force Eye Break window topmost/foreground: {e}")
 
-    # Block here for duration_ms milliseconds
-    cv2.waitKey(duration_ms)
+    # Block here for duration_ms milliseconds, in short waitKey ticks so the
+    # window keeps pumping events and Esc can dismiss it early
+    start_time = time.monotonic()
+    while (time.monotonic() - start_time) * 1000 < duration_ms:
+        if cv2.waitKey(50) & 0xFF == 27:
+            break
+
+    if hwnd:
+        # Hide it for reuse by the next block
+        SW_HIDE = 0
+        user32.ShowWindow(hwnd, SW_HIDE)
+        cv2.waitKey(1)
+    else:
+        cv2.destroyWindow(window_name)
+
+# Break suggestions and block messages, built once at import
+_ACTIVITIES = (
+    "Call or text a loved one and check in.",
+    "Fill a glass of water and drink it slowly.",
+    "Stand up, stretch your neck, shoulders, and back.",
+    "Walk around your room or office for a few minutes.",
+    "Write down three things you're grateful for.",
+    "Do a short breathing exercise: inhale 4s, hold 4s, exhale 4s.",
+    "Look out the window and notice five things you can see.",
+)
+
+_BREAK_MSG_TEMPLATE = (
+    "\n\nEye Strain Detected\n\n"
+    "Take a 5-minute break, spend it wisely to fuel your soul, here is an idea:\n\n"
+    " {suggestion}\n\n"
+    "A tiny pause now saves you from burning out later!"
+)
+
+_20_20_RULE_MSG = (
+    "\n\nSlight Eye Strain Detected\n\n"
+    "Pause and follow the 20-20 rule:\n\n"
+    "- Look at something ~20 feet away\n"
+    "- For at least 20 seconds\n"
+    "- Blink slowly and gently while you do it\n"
+)
 
-    cv2.destroyWindow(window_name)
 
 def block_screen_with_5min_activity():
     """
@@ -204,23 +337,7 @@ def block_screen_with_5min_activity():
     Intended to be called when blink rate drops below a threshold.
     (Do NOT call it here; just define it.)
     """
-    activities = [
-        "Call or text a loved one and check in.",
-        "Fill a glass of water and drink it slowly.",
-        "Stand up, stretch your neck, shoulders, and back.",
-        "Walk around your room or office for a few minutes.",
-        "Write down three things you're grateful for.",
-        "Do a short breathing exercise: inhale 4s, hold 4s, exhale 4s.",
-        "Look out the window and notice five things you can see.",
-    ]
-
-    suggestion = random.choice(activities)
-    message = (   # 1️⃣ Added message = and parentheses
-    "\n\nEye Strain Detected\n\n"
-    "Take a 5-minute break, spend it wisely to fuel your soul, here is an idea:\n\n"
-    f" {suggestion}\n\n"   # 2️⃣ Added \n\n after the suggestion
-    "A tiny pause now saves you from burning out later!"
-)
+    message = _BREAK_MSG_TEMPLATE.format(suggestion=random.choice(_ACTIVITIES))
 
     # 5 minutes = 5 * 60 * 1000 ms
     _show_fullscreen_block(message, duration_ms=5 * 60 * 1000)
@@ -232,179 +349,581 @@ def block_screen_20_20_rule():
     Intended to be called when low eye strain / blinking is detected.
     (Do NOT call it here; just define it.)
     """
-    message = (
-        "\n\nSlight Eye Strain Detected\n\n"
-        "Pause and follow the 20-20 rule:\n\n"
-        "- Look at something ~20 feet away\n"
-        "- For at least 20 seconds\n"
-        "- Blink slowly and gently while you do it\n"
-    )
-
     # 20 seconds = 20 * 1000 ms
-    _show_fullscreen_block(message, duration_ms=20 * 1000)
-
-def show_popup(message, bg_color):
-    def popup():
-        root = tk.Tk()
-        root.overrideredirect(True)              # Remove window border
-        root.attributes("-topmost", True)        # Always on top
-        root.configure(bg=bg_color)
-
-        # Size and position (bottom-right corner)
-        width, height = 380, 110
-        screen_w = root.winfo_screenwidth()
-        screen_h = root.winfo_screenheight()
-        x = screen_w - width - 40
-        y = screen_h - height - 80
-        root.geometry(f"{width}x{height}+{x}+{y}")
+    _show_fullscreen_block(_20_20_RULE_MSG, duration_ms=20 * 1000)
+
+# Popups are shown by one long-lived worker thread that owns the Tk root;
+# it is started on the first popup (only the detection process shows any)
+_popup_queue = queue.Queue()
+_popup_thread = None
+_popup_lock = threading.Lock()
+
+
+def _popup_worker():
+    """Own a hidden popup window and show queued messages in it"""
+    root = tk.Tk()
+    root.withdraw()
+
+    top = tk.Toplevel(root)
+    top.overrideredirect(True)              # Remove window border
+    top.attributes("-topmost", True)        # Always on top
+    top.withdraw()
+
+    # Size and position (bottom-right corner)
+    width, height = 380, 110
+    screen_w = root.winfo_screenwidth()
+    screen_h = root.winfo_screenheight()
+    x = screen_w - width - 40
+    y = screen_h - height - 80
+    top.geometry(f"{width}x{height}+{x}+{y}")
+
+    label = tk.Label(top, font=("Segoe UI", 12), fg="white",
+                     wraplength=360, justify="left")
+    label.pack(expand=True, fill="both", padx=16, pady=12)
+
+    hide_job = None
+
+    def poll_queue():
+        nonlocal hide_job
+        try:
+            while True:
+                message, bg_color = _popup_queue.get_nowait()
+                top.configure(bg=bg_color)
+                label.configure(text=message, bg=bg_color)
+                top.deiconify()
+                top.lift()
+
+                # Auto-close after 3 seconds (restarted by a newer popup)
+                if hide_job is not None:
+                    top.after_cancel(hide_job)
+                hide_job = top.after(3000, top.withdraw)
+        except queue.Empty:
+            pass
+        root.after(100, poll_queue)
+
+    poll_queue()
+    root.mainloop()
 
-        label = tk.Label(root, text=message, font=("Segoe UI", 12),
-                         fg="white", bg=bg_color, wraplength=360, justify="left")
-        label.pack(expand=True, fill="both", padx=16, pady=12)
 
-        # Auto-close after 3 seconds
-        root.after(3000, root.destroy)
-        root.mainloop()
+def show_popup(message, bg_color):
+    global _popup_thread
 
-    threading.Thread(target=popup, daemon=True).start()
+    with _popup_lock:
+        if _popup_thread is None:
+            _popup_thread = threading.Thread(target=_popup_worker, daemon=True)
+            _popup_thread.start()
+    _popup_queue.put((message, bg_color))
 
 
 
-def init_detector():
-    """Initialize the posture detector"""
+def init_detector(frames_per_second):
+    """Initialize the posture detector for frames arriving at frames_per_second"""
     global detector
     try:
-        detector = PostureDetector(distance_threshold=0.18)
+        face_model_path = (FACE_DETECTOR_MODEL if USE_TASKS_FACE_DETECTOR
+                           and os.path.exists(FACE_DETECTOR_MODEL) else None)
+        landmark_model_path = FACE_LANDMARKER_MODEL if os.path.exists(FACE_LANDMARKER_MODEL) else None
+        detector = PostureDetector(distance_threshold=0.18,
+                                   # Blinks span fewer frames at lower rates (4 at 30 fps)
+                                   consec_frames=max(1, round(4 * frames_per_second / 30)),
+                                   # The alert window stays ~10 s of frames
+                                   history_frames=round(10 * frames_per_second),
+                                   face_model_path=face_model_path,
+                                   landmark_model_path=landmark_model_path)
         logger.info("PostureDetector initialized successfully")
         return True
     except Exception as e:
         logger.error(f"Failed to initialize detector: {e}")
         return False
 
-def run_detection_loop():
-    """Continuously capture from camera and detect posture"""
-    global is_detecting, current_status
 
-    try:
-        cap = cv2.VideoCapture(0, cv2.CAP_DSHOW)
-        if not cap.isOpened():
-            logger.error("Cannot access camera")
-            return
+class LatestFrame:
+    """
+    Single-slot, latest-wins handoff between the capture thread and the
+    detection loop. Buffers are swapped rather than copied: put() returns
+    the array it displaced and get() leaves the caller's finished frame in
+    the slot, so the producer never writes into a frame being detected on.
+    """
 
-        cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._frame = None
+        self._fresh = False
+        self._closed = False
+        self.camera_failed = False  # Set by close() when capture stopped on a camera error
+
+    def put(self, frame):
+        """Publish frame as the newest; return the displaced buffer for reuse"""
+        with self._cond:
+            previous, self._frame = self._frame, frame
+            self._fresh = True
+            self._cond.notify()
+        return previous
+
+    def get(self, spare):
+        """
+        Block until a frame newer than the last one taken is available and
+        return it, leaving spare in the slot. Returns None once closed.
+        """
+        with self._cond:
+            while not self._fresh and not self._closed:
+                self._cond.wait()
+            if not self._fresh:
+                return None
+            frame, self._frame = self._frame, spare
+            self._fresh = False
+            return frame
+
+    def close(self, camera_failed=False):
+        """Wake the consumer; no more frames will be published"""
+        with self._cond:
+            self._closed = True
+            self.camera_failed = camera_failed
+            self._cond.notify_all()
+
+
+def _capture_frames(cap, latest, run_event, frame_buf):
+    """Grab every camera frame and publish every DETECT_EVERY_N-th one"""
+    capture_count = 0
+    back = frame_buf
+    camera_failed = True  # Until the loop ends because run_event was cleared
+    try:
+        # Frames queued by the driver while detection was paused are stale;
+        # drop them so the first detection sees a current frame
+        for _ in range(STALE_FRAME_DRAIN):
+            cap.grab()
+
+        while run_event.is_set():
+            # cap.grab() blocks at the camera frame rate, which paces the loop
+            if not cap.grab():
+                logger.error("Failed to read frame")
+                break
 
-        logger.info("Camera opened successfully")
-        frame_count = 0
+            # Keep grabbing every frame so the DirectShow queue stays drained,
+            # but only decode the frames the detector will see
+            capture_count += 1
+            if capture_count % DETECT_EVERY_N:
+                continue
 
-        while is_detecting:
-            ret, frame = cap.read()
+            # back is None until a buffer comes back from the consumer;
+            # retrieve() allocates in that case
+            ret, frame = cap.retrieve(back)
             if not ret:
                 logger.error("Failed to read frame")
                 break
 
-            frame_count += 1
-
-            # Flip for selfie view
-            frame = cv2.flip(frame, 1)
+            back = latest.put(frame)
+        else:
+            camera_failed = False
+    finally:
+        latest.close(camera_failed)
 
-            # Detect posture
-            posture_status, face_size, bbox, is_face_detected, alerts = detector.detect_posture(frame)
 
-            # Update current status for frontend to poll
-            current_status = {
+def _detect_until_paused(cap, status, run_event, frame_buf):
+    """
+    Run detection on the newest camera frames until run_event is cleared.
+    Returns True if capture stopped because the camera failed instead.
+    """
+    frame_count = 0
+    last_popup_time = 0.0
+    published_state = None
+    version = status['version']
+
+    # Start each session from a clean history (a long pause would otherwise
+    # count as time without a face and trip the blink-rate check at once);
+    # the MediaPipe graphs themselves stay loaded
+    detector.reset_state()
+
+    # Capture runs on its own thread so the camera keeps being drained
+    # while the detector works; we always detect on the newest frame
+    latest = LatestFrame()
+    capture_thread = threading.Thread(
+        target=_capture_frames,
+        args=(cap, latest, run_event, frame_buf),
+        daemon=True
+    )
+    capture_thread.start()
+
+    frame = None
+    while True:
+        # Hand back the frame we're done with and wait for a newer one
+        frame = latest.get(frame)
+        if frame is None:
+            break
+
+        frame_count += 1
+
+        # No selfie-view flip here: the frame is never shown, and face
+        # size / EAR are unaffected by mirroring.
+
+        # Detect posture
+        posture_status, face_size, bbox, is_face_detected, alerts = detector.detect_posture(frame)
+        alerts = Alerts._make(alerts[key] for key in ALERT_KEYS)
+
+        # Update current status for frontend to poll (one Manager call,
+        # so readers never observe a partial update). Only publish when
+        # something changed; the version doubles as the /status ETag.
+        state = (posture_status, face_size, is_face_detected, tuple(alerts))
+        if state != published_state:
+            version += 1
+            status.update({
                 'posture_status': posture_status,
-                'face_size': float(face_size) if face_size is not None else None,
+                'face_size': face_size,
                 'is_face_detected': is_face_detected,
-                'alerts': alerts
-            }
-
-            # Log every 10th frame
-            if frame_count % 10 == 0:
+                'alerts_tuple': state[3],
+                'version': version
+            })
+            published_state = state
+
+        # Log every 10th frame
+        if frame_count % 10 == 0:
+            # Lazy %-formatting: nothing is built when INFO is disabled
+            if logger.isEnabledFor(logging.INFO):
                 distance_str = f"{face_size:.3f}" if face_size is not None else "None"
-                print(f"[DETECT] Face: {is_face_detected} | Distance: {distance_str} | Status: {posture_status} | Bad: {alerts['bad_alert']} | Warning: {alerts['warning_alert']} | NoFace: {alerts['no_face_alert']}")
+                logger.info("[DETECT] Face: %s | Distance: %s | Status: %s | Bad: %s | Warning: %s | NoFace: %s",
+                            is_face_detected, distance_str, posture_status,
+                            alerts.bad, alerts.warning, alerts.no_face)
 
-                # Trigger alerts
-                if alerts['bad_alert']:
+            # Nothing to dispatch in the common no-alert case
+            if not any(alerts):
+                continue
+
+            # Trigger alerts, rate-limited so repeated detections don't
+            # spawn a popup every tick
+            now = time.monotonic()
+            if now - last_popup_time >= POPUP_MIN_INTERVAL:
+                if alerts.bad:
                     msg = "🚨 BAD POSTURE \nMove back from the screen!"
                     show_popup(msg, "#C62828")  # Red
                     logger.warning(msg)
-                elif alerts['warning_alert']:
+                    last_popup_time = now
+                elif alerts.warning:
                     msg = "⚠️  WARNING - Adjust your posture!"
                     show_popup(msg, "#F57C00")
                     logger.warning("⚠️  WARNING - Adjust your posture!")
-                # elif alerts['no_face_alert']:
-                #     logger.warning("👤 NO FACE DETECTED - Face not in frame!")
-                if alerts.get('serious_eye_strain'):
-                    block_screen_with_5min_activity()
-                elif alerts.get('low_blink_rate_alert'):
-                    block_screen_20_20_rule()
+                    last_popup_time = now
+            # elif alerts.no_face:
+            #     logger.warning("👤 NO FACE DETECTED - Face not in frame!")
+            if alerts.serious_eye_strain:
+                block_screen_with_5min_activity()
+            elif alerts.low_blink:
+                block_screen_20_20_rule()
+
+    capture_thread.join()
+    return latest.camera_failed
+
+
+def run_detection_loop(status, run_event, ready_event):
+    """
+    Capture from camera and detect posture whenever run_event is set.
+    Runs in the long-lived detection process: the detector and the camera
+    are opened once and kept across /stop and /start, so resuming skips
+    the MediaPipe graph setup and the DirectShow handshake.
+    """
+    # A process forked after the server capped OpenCV at one thread inherits
+    # that cap (respawns from /start); restore the default pool here
+    cv2.setNumThreads(-1)
+
+    if not init_detector(CAMERA_DETECT_FPS):
+        return
+    ready_event.set()
+
+    # The process is started with the server; leave the camera closed
+    # until detection is first requested
+    run_event.wait()
+
+    try:
+        cap = cv2.VideoCapture(0, cv2.CAP_DSHOW)
+        if not cap.isOpened():
+            logger.error("Cannot access camera")
+            return
+        atexit.register(cap.release)
+
+        # MJPG keeps USB bandwidth and driver-side conversion down, and the
+        # detector only needs a small frame (face size is a ratio of the frame)
+        cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*'MJPG'))
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, 320)
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 240)
 
-            # Small delay to avoid CPU spinning
-            time.sleep(0.01)  # ~100 FPS capture, process at ~10 FPS
+        # Keep the driver queue as short as the backend allows
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+
+        logger.info("Camera opened successfully")
+
+        # Preallocated frame buffers circulate between the capture thread and
+        # the detection loop instead of OpenCV allocating a new array per frame
+        frame_w = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)) or 320
+        frame_h = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)) or 240
+        frame_buf = np.empty((frame_h, frame_w, 3), dtype=np.uint8)
+
+        while True:
+            run_event.wait()
+            # run_event alone can't tell a failure from a pause: a /start
+            # may set it again before this session has finished unwinding
+            if _detect_until_paused(cap, status, run_event, frame_buf):
+                break
 
         cap.release()
         logger.info("Camera released")
     except Exception as e:
         logger.error(f"Detection loop error: {e}")
-    finally:
-        is_detecting = False
+
+
+def status_snapshot():
+    """
+    Return a plain-dict copy of the shared detection status.
+    DictProxy.copy() and DictProxy.update() each run as a single call in the
+    Manager process, so a snapshot never sees a half-written update.
+    """
+    return current_status.copy()
+
+
+def is_detecting():
+    """Whether the detection process is running and not paused"""
+    return (detection_process is not None and detection_process.is_alive()
+            and run_event.is_set())
+
+
+def json_response(payload, status=200):
+    """JSON response serialized with orjson (much faster than Flask's stdlib json)"""
+    return app.response_class(orjson.dumps(payload), status=status,
+                              mimetype='application/json')
+
+
+@app.after_request
+def disable_caching(response):
+    """Polled state is always live; never let it be cached unless revalidated"""
+    response.headers.setdefault('Cache-Control', 'no-store')
+    return response
+
+
+@app.errorhandler(413)
+def frame_too_large(error):
+    """Bodies over MAX_CONTENT_LENGTH get JSON like every other /detect error"""
+    return json_response({'error': 'Frame too large'}, 413)
 
 
 @app.route('/health', methods=['GET'])
 def health():
     """Health check endpoint"""
-    return jsonify({
+    return json_response({
         'status': 'ok',
-        'detecting': is_detecting,
-        'detector_ready': detector is not None
-    }), 200
+        'detecting': is_detecting(),
+        'detector_ready': detector_ready.is_set()
+    })
+
+
+def start_detection_process():
+    """
+    Start the detection process (paused unless run_event is set) and wait
+    for its detector. Returns False if the detector never came up.
+    """
+    global detection_process
+
+    detector_ready.clear()
+    detection_process = multiprocessing.Process(
+        target=run_detection_loop,
+        args=(current_status, run_event, detector_ready),
+        daemon=True
+    )
+    detection_process.start()
+    return wait_for_detector()
+
+
+def wait_for_detector():
+    """Wait until the detection process's detector is ready; False if it exits or times out"""
+    deadline = time.monotonic() + DETECTOR_START_TIMEOUT
+    while not detector_ready.wait(0.1):
+        if not detection_process.is_alive() or time.monotonic() >= deadline:
+            return False
+    return True
 
 
 @app.route('/start', methods=['POST'])
 def start():
     """Start posture detection"""
-    global is_detecting, detection_thread
-
-    if is_detecting:
-        return jsonify({'status': 'already detecting'}), 200
+    if is_detecting():
+        return json_response({'status': 'already detecting'})
 
     try:
-        is_detecting = True
-        detection_thread = threading.Thread(target=run_detection_loop, daemon=True)
-        detection_thread.start()
+        run_event.set()
+
+        # The detection process is started once and then only paused and
+        # resumed; start a new one if it has exited
+        if detection_process is None or not detection_process.is_alive():
+            ready = start_detection_process()
+        else:
+            ready = wait_for_detector()
+        if not ready:
+            run_event.clear()
+            logger.error("Failed to start detection: detector did not initialize")
+            return json_response({'error': 'Detector failed to initialize'}, 500)
+
         logger.info("Detection started")
-        return jsonify({'status': 'started'}), 200
+        return json_response({'status': 'started'})
     except Exception as e:
         logger.error(f"Failed to start detection: {e}")
-        is_detecting = False
-        return jsonify({'error': str(e)}), 500
+        run_event.clear()
+        return json_response({'error': str(e)}, 500)
 
 
 @app.route('/stop', methods=['POST'])
 def stop():
-    """Stop posture detection"""
-    global is_detecting
-
-    is_detecting = False
+    """Stop posture detection (the detection process stays warm)"""
+    run_event.clear()
     logger.info("Detection stopped")
-    return jsonify({'status': 'stopped'}), 200
+    return json_response({'status': 'stopped'})
+
+
+def _run_detect_worker():
+    """Build the server-side detector and run queued /detect frames through it"""
+    ready = init_detector(UPLOAD_DETECT_FPS)
+    while True:
+        frame, future = _detect_queue.get()
+        if not ready:
+            future.set_result(None)
+            continue
+        try:
+            future.set_result(detector.detect_posture(frame))
+        except Exception as e:
+            future.set_exception(e)
+
+
+def _submit_frame(frame):
+    """Queue a frame for the detect worker; return a Future of its detect_posture result"""
+    global _detect_worker
+
+    with _detect_worker_lock:
+        if _detect_worker is None:
+            _detect_worker = threading.Thread(target=_run_detect_worker, daemon=True)
+            _detect_worker.start()
+
+    future = Future()
+    _detect_queue.put((frame, future))
+    return future
+
+
+def _read_body_into(buf):
+    """Read the request body into buf and return a memoryview of the bytes read"""
+    view = memoryview(buf)
+    total = 0
+    while total < len(view):
+        n = request.stream.readinto(view[total:])
+        if not n:
+            break
+        total += n
+    return view[:total]
+
+
+def _decode_frame(jpeg):
+    """Decode a JPEG for the detector, at half resolution when it is large enough"""
+    # imdecode raises (rather than returning None) on an empty buffer
+    if not len(jpeg):
+        return None
+    data = np.frombuffer(jpeg, np.uint8)
+    frame = cv2.imdecode(data, cv2.IMREAD_REDUCED_COLOR_2)
+    if frame is not None and frame.shape[1] < DECODE_MIN_WIDTH:
+        frame = cv2.imdecode(data, cv2.IMREAD_COLOR)
+    return frame
+
+
+@app.route('/detect', methods=['POST'])
+def detect():
+    """
+    Detect posture on one frame sent by the extension.
+    The body is the raw JPEG (Content-Type image/jpeg); the older JSON
+    {"frame": "<base64 data URL>"} form is still accepted.
+    """
+    if request.is_json:
+        # get_data enforces MAX_CONTENT_LENGTH before buffering; cache=False
+        # and orjson avoid Flask keeping a second copy of the body around
+        try:
+            data_url = orjson.loads(request.get_data(cache=False)).get('frame', '')
+        except (orjson.JSONDecodeError, AttributeError):
+            return json_response({'error': 'Invalid JSON body'}, 400)
+        if not isinstance(data_url, str):
+            return json_response({'error': 'frame must be a base64 string'}, 400)
+        try:
+            jpeg = base64.b64decode(data_url.split(',', 1)[-1])
+        except binascii.Error:
+            return json_response({'error': 'Invalid base64 frame'}, 400)
+        frame = _decode_frame(jpeg)
+    else:
+        # Raw bytes (no base64 inflation, no JSON string copy), read straight
+        # into a pooled buffer instead of a fresh bytes object per frame;
+        # request.stream enforces MAX_CONTENT_LENGTH like get_data does
+        upload_buf = _upload_pool.get()
+        try:
+            jpeg = _read_body_into(upload_buf)
+            frame = _decode_frame(jpeg)
+        finally:
+            _upload_pool.put(upload_buf)
+
+    if frame is None:
+        return json_response({'error': 'Could not decode frame'}, 400)
+
+    result = _submit_frame(frame).result()
+    if result is None:
+        return json_response({'error': 'Detector unavailable'}, 503)
+    posture_status, face_size, bbox, is_face_detected, alerts = result
+
+    return json_response({
+        'status': posture_status,
+        'faceSize': face_size,
+        'isFaceDetected': is_face_detected,
+        'badAlert': alerts['bad_alert'],
+        'warningAlert': alerts['warning_alert'],
+        'noFaceAlert': alerts['no_face_alert']
+    })
 
 
 @app.route('/status', methods=['GET'])
 def status():
     """Get current detection status"""
-    return jsonify(current_status), 200
+    snapshot = status_snapshot()
+
+    # Unchanged since the client's copy: answer 304 without serializing
+    etag = f"{BOOT_ID}-{snapshot.pop('version')}"
+    if request.if_none_match.contains_weak(etag):
+        response = app.response_class(status=304)
+    else:
+        snapshot['alerts'] = dict(zip(ALERT_KEYS, snapshot.pop('alerts_tuple')))
+
+        response = json_response(snapshot)
+
+    # no-cache (not no-store) so the browser keeps the body and revalidates
+    # with If-None-Match on the next poll
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
 
 
 if __name__ == '__main__':
-    # Initialize detector
-    if init_detector():
-        # Run Flask server
-        logger.info("Starting Flask server on http://localhost:5000")
-        app.run(host='localhost', port=5000, debug=False)
-    else:
-        logger.error("Failed to start server - detector initialization failed")
+    # Shared state must be created under the main guard: the detection
+    # process re-imports this module on spawn-based platforms (Windows)
+    manager = multiprocessing.Manager()
+    current_status = manager.dict(DEFAULT_STATUS)
+    run_event = multiprocessing.Event()
+    detector_ready = multiprocessing.Event()
+    for _ in range(UPLOAD_BUFFERS):
+        _upload_pool.put(bytearray(MAX_FRAME_BYTES))
+
+    # Build the detector up front (in the detection process, which then
+    # waits paused for /start), and refuse to serve if it can't be built
+    if not start_detection_process():
+        logger.error("Detector failed to initialize; not starting the server")
+        raise SystemExit(1)
+
+    # /detect already decodes on every waitress thread in parallel with the
+    # detect worker; keep OpenCV's own pool from oversubscribing the cores.
+    # Detection processes reset this themselves in run_detection_loop
+    cv2.setNumThreads(1)
+
+    # Serve with waitress (a production WSGI server that, unlike gunicorn,
+    # runs on Windows) in this one process, so the server-side detector
+    # and its worker thread are shared by every request thread
+    logger.info("Starting Flask server on http://localhost:5000")
+    serve(app, host='localhost', port=5000, threads=SERVER_THREADS)
         
 
 
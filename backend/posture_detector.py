@@ -1,112 +1,346 @@
 import cv2
+import logging
+import math
 import mediapipe as mp
 import numpy as np
+import queue
+import threading
 import time
-import winsound  # For Windows beeping alerts
-from collections import deque
+from collections import namedtuple
+from mediapipe.tasks.python import BaseOptions, vision
+
+try:
+    import winsound  # For Windows beeping alerts
+except ImportError:  # Not on Windows: alerts are silent
+    winsound = None
+
+logger = logging.getLogger(__name__)
 
 # Initialize MediaPipe Face Detection and Face Mesh
 mp_face_detection = mp.solutions.face_detection
 mp_face_mesh = mp.solutions.face_mesh
 mp_drawing = mp.solutions.drawing_utils
 
+# Face bounding box in relative (0-1) coordinates, as returned by both
+# detector backends (same fields as the legacy relative_bounding_box)
+RelativeBox = namedtuple('RelativeBox', 'xmin ymin width height')
+
+# Posture statuses as stored in the rolling window; warning and bad are the
+# codes >= WARNING_CODE
+# Per-side scale that brings Tasks short-range boxes in line with the legacy
+# full-range model: measured face sizes were 0.031 vs 0.037 for the same
+# distance, so sqrt(0.037 / 0.031) keeps distance_threshold meaning the same
+# distance on either backend
+TASKS_BOX_SCALE = math.sqrt(0.037 / 0.031)
+
+STATUS_CODES = {'good': 0, 'warning': 1, 'bad': 2}
+WARNING_CODE = STATUS_CODES['warning']
+BAD_CODE = STATUS_CODES['bad']
+
+
+def box_to_pixels(bbox, frame_width, frame_height):
+    """Map a relative bbox to (x_min, y_min, x_max, y_max) pixels clamped to the frame."""
+    xmin, ymin, width, height = bbox.xmin, bbox.ymin, bbox.width, bbox.height
+    return (max(0, int(xmin * frame_width)),
+            max(0, int(ymin * frame_height)),
+            min(frame_width, int((xmin + width) * frame_width)),
+            min(frame_height, int((ymin + height) * frame_height)))
+
+
+def _create_task(task_class, options_class, model_path, **options):
+    """Create a MediaPipe Tasks API graph, preferring the GPU delegate."""
+    for delegate in (BaseOptions.Delegate.GPU, BaseOptions.Delegate.CPU):
+        task_options = options_class(
+            base_options=BaseOptions(model_asset_path=model_path, delegate=delegate),
+            **options
+        )
+        try:
+            return task_class.create_from_options(task_options)
+        except Exception as e:
+            # The GPU delegate isn't available everywhere (e.g. Windows)
+            if delegate == BaseOptions.Delegate.CPU:
+                raise
+            logger.warning("GPU delegate unavailable, falling back to CPU: %s", e)
+
+
 class PostureDetector:
-    def __init__(self, distance_threshold=0.18, smoothing_frames=10):
+    def __init__(self, distance_threshold=0.18, smoothing_frames=10, consec_frames=4,
+                 face_model_path=None, draw_landmarks=False, inference_width=320,
+                 landmark_model_path=None, history_frames=300):
         """
         Initialize the posture detector.
 
         Args:
             distance_threshold: Face size threshold (0-1). Lower values = closer to camera = bad posture
             smoothing_frames: Number of frames to average for smooth detection
+            consec_frames: Consecutive closed-eye frames needed to confirm a blink
+            face_model_path: Optional BlazeFace .tflite model; when given, face detection uses the
+                MediaPipe Tasks API (GPU delegate where available) instead of the legacy solution,
+                with boxes scaled by TASKS_BOX_SCALE so face sizes match the legacy model
+            draw_landmarks: Draw the eye landmarks onto the BGR frame passed to detect_posture;
+                only useful when the frame is displayed, as in main()
+            inference_width: Frames wider than this are downscaled (keeping aspect) before
+                MediaPipe runs; both models resize to ~192-256px internally anyway
+            landmark_model_path: Optional face_landmarker .task bundle; when given, blink landmarks
+                come from the Tasks API FaceLandmarker in LIVE_STREAM mode (GPU delegate where
+                available) instead of the legacy Face Mesh solution
+            history_frames: Frames in the rolling window the posture alerts average over; size it
+                to ~10 seconds of processed frames (300 at 30fps)
         """
         self.distance_threshold = distance_threshold
         self.smoothing_frames = smoothing_frames
-        self.face_size_history = deque(maxlen=smoothing_frames)
+        # Ring buffer of recent face sizes (preallocated; no per-frame allocation)
+        self.face_size_history = np.zeros(smoothing_frames, dtype=np.float64)
+        self.face_size_index = 0  # Next slot to write
+        self.face_size_count = 0  # Filled slots
+        self.face_size_sum = 0.0  # Sum of the filled slots
         self.bad_posture_counter = 0
         self.bad_posture_threshold = 3  # Alert after 3 consecutive bad frames
+        self.beep_interval = 1.0  # Minimum seconds between alert sounds
+        self.last_beep_time = 0
 
         # Time tracking for alerts (in seconds)
         self.no_face_duration = 0
         self.last_face_time = time.time()
 
-        # Rolling window for averaging (tracks last 10 seconds of frames)
-        self.frame_history = deque(maxlen=300)  # ~10 seconds at 30fps
-        self.frame_timestamps = deque(maxlen=300)
+        # Rolling window for averaging (tracks the last ~10 seconds of
+        # processed frames): a ring buffer of STATUS_CODES
+        self.frame_history = np.zeros(history_frames, dtype=np.int8)
+        self.frame_history_index = 0  # Next slot to write
+        self.frame_history_count = 0  # Filled slots
+        self.bad_count = 0  # BAD_CODE frames in frame_history
+        self.warn_or_bad_count = 0  # Frames in frame_history at WARNING_CODE or above
 
         # Alert thresholds
         self.no_face_threshold = 30  # Alert if face not detected for 30 seconds
         self.warning_avg_threshold = 0.6  # Alert if 60% of frames in last 10s are warning+
         self.bad_avg_threshold = 0.5  # Alert if 50% of frames in last 10s are bad
 
-        # Initialize MediaPipe Face Detection once
-        self.face_detection = mp_face_detection.FaceDetection(
-            model_selection=1,  # 0 for short range, 1 for full range
-            min_detection_confidence=0.7
-        )
+        # Face detection runs every frame_skip frames while a face is tracked
+        self.frame_skip = 3
+        self.frames_since_detect = 0
+        self.last_bbox = None
+        self.landmarks_found = False  # Whether Face Mesh found a face this frame
+        self.mesh_lost_face = False  # Face Mesh ran on a detected face and found none
 
-        # Initialize MediaPipe Face Mesh for eye blinking detection
-        self.face_mesh = mp_face_mesh.FaceMesh(
-            static_image_mode=False,
-            max_num_faces=1,
-            min_detection_confidence=0.5
-        )
+        self.inference_width = inference_width
+        # Derived from the frame shape, recomputed only when it changes
+        self.frame_shape = None
+        self.inference_size = None  # (width, height) to downscale to, or None
+        self.small_buffer = None  # Reused downscaled BGR frame
+        self.rgb_buffer = None  # Reused RGB copy of the inference frame
+
+        # Initialize MediaPipe Face Detection once
+        self.last_timestamp_ms = -1  # Last timestamp sent to a Tasks API graph
+        if face_model_path:
+            self.face_detector = self._create_face_detector(face_model_path)
+            self.face_detection = None
+        else:
+            self.face_detector = None
+            self.face_detection = mp_face_detection.FaceDetection(
+                model_selection=1,  # 0 for short range, 1 for full range
+                min_detection_confidence=0.7
+            )
+
+        # Initialize MediaPipe Face Mesh for eye blinking detection. The Tasks
+        # FaceLandmarker runs asynchronously: its callback stores the newest
+        # landmarks and detect_blinks consumes them on a later frame.
+        self.latest_landmarks = None  # (landmarks or None) not yet consumed
+        self.landmarks_lock = threading.Lock()  # The callback runs on MediaPipe's thread
+        if landmark_model_path:
+            self.face_landmarker = self._create_face_landmarker(landmark_model_path)
+            self.face_mesh = None
+        else:
+            self.face_landmarker = None
+            self.face_mesh = mp_face_mesh.FaceMesh(
+                static_image_mode=False,
+                max_num_faces=1,
+                min_detection_confidence=0.5
+            )
 
         # Eye blink tracking (following the BlinkCounter pattern)
         self.blink_count = 0  # Total blinks detected
         self.frame_counter = 0  # Consecutive frames with eyes closed
         self.ear_threshold = 0.3  # Eye aspect ratio threshold
-        self.consec_frames = 4  # Minimum consecutive frames to confirm blink
+        self.consec_frames = consec_frames  # Minimum consecutive frames to confirm blink
+        self.min_blink_face_size = 0.02  # Smoothed face size below which blinks aren't tracked
+        self.draw_landmarks = draw_landmarks
+        self.bar_cache = None  # Pre-rendered threshold bar for draw_feedback
+        self.bar_cache_key = None  # (frame width, distance_threshold) it was drawn for
 
         # Eye landmarks for visualization and EAR calculation
         self.RIGHT_EYE = [33, 7, 163, 144, 145, 153, 154, 155, 133, 173, 157, 158, 159, 160, 161, 246]
         self.LEFT_EYE = [362, 382, 381, 380, 374, 373, 390, 249, 263, 466, 388, 387, 386, 385, 384, 398]
+        self.BOTH_EYES = self.RIGHT_EYE + self.LEFT_EYE
+        # Preallocated (N, 1, 2) point arrays for drawing the eye landmarks
+        self.eye_draw_points = np.empty((len(self.BOTH_EYES), 1, 2), dtype=np.float32)
+        self.eye_draw_pixels = np.empty((len(self.BOTH_EYES), 1, 2), dtype=np.int32)
         self.RIGHT_EYE_EAR = [33, 159, 158, 133, 153, 145]
         self.LEFT_EYE_EAR = [362, 380, 374, 263, 386, 385]
+        # EAR only needs these 12 of the 468 mesh landmarks (right eye, then
+        # left); they're copied each frame into a preallocated array
+        self.EAR_LANDMARKS = self.RIGHT_EYE_EAR + self.LEFT_EYE_EAR
+        self.ear_points = np.empty((len(self.EAR_LANDMARKS), 2), dtype=np.float32)
 
         # Colors for visualization
         self.GREEN_COLOR = (86, 241, 13)  # Eyes open
         self.RED_COLOR = (30, 46, 209)    # Eyes closed
 
         # Blink rate tracking (for low blink rate warning)
-        self.blink_timestamps = deque()  # Track when blinks occur
+        self.blinks_since_check = 0  # Blinks since the last blink-rate check
+        self.frames_since_check = 0  # Frames since the last blink-rate check
+        self.far_frames_since_check = 0  # ...of which skipped Face Mesh as too far away
         self.blink_rate_check_interval = 60  # Check blink rate every 60 seconds
         self.last_blink_rate_check = time.time()
         self.absolute_min_blinks_per_minute = 7  # Warn if below this threshold
         self.min_blinks_per_minute = 11
         self.low_blink_rate_alert_triggered = False  # Prevent repeated alerts
 
-    def calculate_face_size(self, detection, frame_width, frame_height):
-        """Calculate the relative size of the detected face."""
-        bbox = detection.location_data.relative_bounding_box
-        width = bbox.width * frame_width
-        height = bbox.height * frame_height
-        face_area = width * height
-        frame_area = frame_width * frame_height
-        face_size_ratio = face_area / frame_area
-        return face_size_ratio, bbox
+    def reset_state(self):
+        """
+        Clear the tracking history (face sizes, posture window, blink timing)
+        for a fresh session. The MediaPipe graphs are kept, so this is cheap
+        compared with building a new PostureDetector.
+        """
+        now = time.time()
+
+        self.face_size_index = 0
+        self.face_size_count = 0
+        self.face_size_sum = 0.0
+        self.bad_posture_counter = 0
+
+        self.no_face_duration = 0
+        self.last_face_time = now
+
+        self.frame_history_index = 0
+        self.frame_history_count = 0
+        self.bad_count = 0
+        self.warn_or_bad_count = 0
+
+        self.frames_since_detect = 0
+        self.last_bbox = None
+        self.landmarks_found = False
+        self.mesh_lost_face = False
+        with self.landmarks_lock:
+            self.latest_landmarks = None
+
+        self.blink_count = 0
+        self.frame_counter = 0
+        self.blinks_since_check = 0
+        self.frames_since_check = 0
+        self.far_frames_since_check = 0
+        self.last_blink_rate_check = now
+        self.low_blink_rate_alert_triggered = False
+
+    def _create_face_detector(self, model_path):
+        """Create a VIDEO-mode Tasks API FaceDetector."""
+        return _create_task(vision.FaceDetector, vision.FaceDetectorOptions, model_path,
+                            running_mode=vision.RunningMode.VIDEO,
+                            min_detection_confidence=0.7)
+
+    def _create_face_landmarker(self, model_path):
+        """Create a LIVE_STREAM Tasks API FaceLandmarker reporting to _on_landmarks."""
+        return _create_task(vision.FaceLandmarker, vision.FaceLandmarkerOptions, model_path,
+                            running_mode=vision.RunningMode.LIVE_STREAM,
+                            num_faces=1,
+                            min_face_detection_confidence=0.5,
+                            result_callback=self._on_landmarks)
+
+    def _on_landmarks(self, result, image, timestamp_ms):
+        """FaceLandmarker callback (MediaPipe's thread): keep the newest result."""
+        landmarks = result.face_landmarks[0] if result.face_landmarks else None
+        with self.landmarks_lock:
+            self.latest_landmarks = (landmarks,)
+
+    def _next_timestamp_ms(self):
+        """
+        Timestamp for a VIDEO / LIVE_STREAM Tasks call. Those modes carry
+        state between calls and reject any timestamp that isn't strictly
+        greater than the previous one, which two frames landing in the same
+        millisecond would otherwise produce.
+        """
+        timestamp_ms = max(int(time.monotonic() * 1000), self.last_timestamp_ms + 1)
+        self.last_timestamp_ms = timestamp_ms
+        return timestamp_ms
+
+    def detect_face(self, frame_rgb):
+        """
+        Run face detection on an RGB frame.
+
+        Returns:
+            Relative bounding box of the first detected face, or None
+        """
+        if self.face_detector is not None:
+            image = mp.Image(image_format=mp.ImageFormat.SRGB, data=frame_rgb)
+            result = self.face_detector.detect_for_video(image, self._next_timestamp_ms())
+            if not result.detections:
+                return None
+
+            # Tasks API boxes are in pixels of the image it was given. The
+            # short-range model draws tighter boxes than the legacy full-range
+            # one, so grow them about their centre to match its face sizes.
+            box = result.detections[0].bounding_box
+            image_height, image_width = frame_rgb.shape[:2]
+            width = box.width * TASKS_BOX_SCALE / image_width
+            height = box.height * TASKS_BOX_SCALE / image_height
+            return RelativeBox((box.origin_x + box.width / 2) / image_width - width / 2,
+                               (box.origin_y + box.height / 2) / image_height - height / 2,
+                               width, height)
+
+        results = self.face_detection.process(frame_rgb)
+        if not results.detections:
+            return None
+
+        # Use first detected face. Copy the protobuf fields into a plain
+        # tuple once, so later reads skip the descriptor lookups.
+        box = results.detections[0].location_data.relative_bounding_box
+        return RelativeBox(box.xmin, box.ymin, box.width, box.height)
+
+    def calculate_face_size(self, bbox, frame_width, frame_height):
+        """Calculate the relative size of the detected face (as a Python float)."""
+        # The bbox is already relative, so the frame dimensions cancel out
+        return bbox.width * bbox.height
+
+    def add_face_size(self, face_size):
+        """Record a face size in the smoothing ring buffer, keeping its running sum."""
+        index = self.face_size_index
+        if self.face_size_count == self.smoothing_frames:
+            self.face_size_sum -= self.face_size_history[index]
+        else:
+            self.face_size_count += 1
+        self.face_size_history[index] = face_size
+        self.face_size_sum += face_size
+        self.face_size_index = (index + 1) % self.smoothing_frames
+
+        # Re-sum once per lap so floating-point drift can't accumulate
+        if self.face_size_index == 0:
+            self.face_size_sum = float(self.face_size_history.sum())
 
     def get_smoothed_face_size(self):
         """Get smoothed face size from history."""
-        if not self.face_size_history:
+        if not self.face_size_count:
             return None
-        return np.mean(list(self.face_size_history))
+        return self.face_size_sum / self.face_size_count
 
-    def eye_aspect_ratio(self, eye_indices, landmarks):
+    def eye_aspect_ratio(self, p):
         """
         Calculate Eye Aspect Ratio (EAR) for blink detection.
         Uses the formula: EAR = (A + B) / (2.0 * C)
         where A, B are vertical distances and C is horizontal distance.
 
         Args:
-            eye_indices: List of 6 landmark indices [0=inner, 1=top, 2=top2, 3=outer, 4=bottom2, 5=bottom]
-            landmarks: List of all facial landmarks with x,y coordinates
+            p: (6, 2) array of one eye's x,y landmarks [0=inner, 1=top, 2=top2, 3=outer, 4=bottom2, 5=bottom]
         """
+        # One conversion to Python floats; indexing the array element by
+        # element would box a numpy scalar for every coordinate
+        (x0, y0), (x1, y1), (x2, y2), (x3, y3), (x4, y4), (x5, y5) = p.tolist()
+
         # A = distance between top landmarks
-        A = np.linalg.norm(np.array(landmarks[eye_indices[1]]) - np.array(landmarks[eye_indices[5]]))
+        A = math.hypot(x1 - x5, y1 - y5)
         # B = distance between top2 and bottom2 landmarks
-        B = np.linalg.norm(np.array(landmarks[eye_indices[2]]) - np.array(landmarks[eye_indices[4]]))
+        B = math.hypot(x2 - x4, y2 - y4)
         # C = distance between inner and outer corners
-        C = np.linalg.norm(np.array(landmarks[eye_indices[0]]) - np.array(landmarks[eye_indices[3]]))
+        C = math.hypot(x0 - x3, y0 - y3)
 
         # Calculate EAR
         ear = (A + B) / (2.0 * C)
@@ -130,9 +364,9 @@ class PostureDetector:
             if self.frame_counter >= self.consec_frames:
                 self.blink_count += 1
                 blink_detected = True
-                # Record timestamp for blink rate tracking
-                self.blink_timestamps.append(time.time())
-                print(f"👁️ BLINK DETECTED! (Total: {self.blink_count})")
+                # Count towards the blink-rate check
+                self.blinks_since_check += 1
+                logger.debug("👁️ BLINK DETECTED! (Total: %d)", self.blink_count)
             self.frame_counter = 0
 
         return blink_detected
@@ -157,42 +391,64 @@ class PostureDetector:
         Args:
             frame_rgb: Frame in RGB format for Face Mesh processing
             frame_bgr: Frame in BGR format for visualization
+
+        Returns:
+            True if a blink completed, False otherwise, or None when the
+            LIVE_STREAM landmarker had no new result to consume this frame
         """
-        results = self.face_mesh.process(frame_rgb)
+        if self.face_landmarker is not None:
+            # Queue this frame and use the newest finished result; nothing
+            # new has finished yet means no blink update this frame
+            self.face_landmarker.detect_async(
+                mp.Image(image_format=mp.ImageFormat.SRGB, data=frame_rgb),
+                self._next_timestamp_ms())
+            with self.landmarks_lock:
+                pending, self.latest_landmarks = self.latest_landmarks, None
+            if pending is None:
+                return None
+            landmarks = pending[0]
+        else:
+            results = self.face_mesh.process(frame_rgb)
+            landmarks = (results.multi_face_landmarks[0].landmark
+                         if results.multi_face_landmarks else None)
+        self.landmarks_found = landmarks is not None
 
-        if not results.multi_face_landmarks:
+        if not self.landmarks_found:
             # Debug: Face Mesh not detecting landmarks
             if not hasattr(self, '_debug_logged'):
-                print("[BLINK] Face Mesh not detecting landmarks - checking if face is visible and well-lit")
+                logger.debug("[BLINK] Face Mesh not detecting landmarks - checking if face is visible and well-lit")
                 self._debug_logged = True
             return False
 
         # Reset debug flag when landmarks are detected
         self._debug_logged = False
 
-        landmarks_list = []
-        for landmark in results.multi_face_landmarks[0].landmark:
-            landmarks_list.append([landmark.x, landmark.y])
+        # Read only the EAR landmarks, not all 468
+        points = self.ear_points
+        for i, idx in enumerate(self.EAR_LANDMARKS):
+            landmark = landmarks[idx]
+            points[i, 0] = landmark.x
+            points[i, 1] = landmark.y
 
         # Calculate Eye Aspect Ratio for both eyes
-        right_ear = self.eye_aspect_ratio(self.RIGHT_EYE_EAR, landmarks_list)
-        left_ear = self.eye_aspect_ratio(self.LEFT_EYE_EAR, landmarks_list)
+        right_ear = self.eye_aspect_ratio(points[:6])
+        left_ear = self.eye_aspect_ratio(points[6:])
         ear = (right_ear + left_ear) / 2.0
 
-        # Determine color based on EAR
-        color = self.set_colors(ear)
-
-        # Draw eye landmarks on the frame
-        self._draw_eye_landmarks(frame_bgr, landmarks_list, self.RIGHT_EYE, color)
-        self._draw_eye_landmarks(frame_bgr, landmarks_list, self.LEFT_EYE, color)
+        # Draw eye landmarks on the frame, colored by EAR (skipped when
+        # nothing displays the frame, e.g. the Flask service)
+        if self.draw_landmarks:
+            color = self.set_colors(ear)
+            self._draw_eye_landmarks(frame_bgr, landmarks, self.BOTH_EYES, color)
 
         # Debug: Print EAR values every 30 frames
         if not hasattr(self, '_frame_counter_debug'):
             self._frame_counter_debug = 0
         self._frame_counter_debug += 1
 
-        if self._frame_counter_debug % 30 == 0:
-            print(f"[EAR] R:{right_ear:.3f} L:{left_ear:.3f} Avg:{ear:.3f} Threshold:{self.ear_threshold} Frame_cnt:{self.frame_counter}")
+        if self._frame_counter_debug % 30 == 0 and logger.isEnabledFor(logging.DEBUG):
+            logger.debug("[EAR] R:%.3f L:%.3f Avg:%.3f Threshold:%s Frame_cnt:%d",
+                         right_ear, left_ear, ear, self.ear_threshold, self.frame_counter)
 
         # Update blink detection using the update_blink_count method
         blink_detected = self.update_blink_count(ear)
@@ -205,16 +461,38 @@ class PostureDetector:
 
         Args:
             frame: Video frame to draw on
-            landmarks: List of facial landmarks (normalized coordinates)
-            eye_indices: Indices of landmarks for one eye
+            landmarks: Facial landmarks (normalized coordinates)
+            eye_indices: Indices of the eye landmarks to draw
             color: BGR color values for drawing
         """
         frame_height, frame_width, _ = frame.shape
-        for idx in eye_indices:
-            if idx < len(landmarks):
-                x = int(landmarks[idx][0] * frame_width)
-                y = int(landmarks[idx][1] * frame_height)
-                cv2.circle(frame, (x, y), 2, color, -1)
+        points = self.eye_draw_points[:len(eye_indices)]
+        for i, idx in enumerate(eye_indices):
+            landmark = landmarks[idx]
+            points[i, 0, 0] = landmark.x
+            points[i, 0, 1] = landmark.y
+        points *= (frame_width, frame_height)
+        pixels = self.eye_draw_pixels[:len(eye_indices)]
+        pixels[...] = points
+
+        # One call for every dot: each point is its own closed one-point
+        # polyline, which OpenCV draws as a filled dot (radius 2)
+        cv2.polylines(frame, pixels, True, color, 4)
+
+    def _set_frame_shape(self, shape):
+        """Work out the inference size and (re)allocate its buffers for a new frame shape."""
+        self.frame_shape = shape
+        frame_height, frame_width, channels = shape
+        if frame_width > self.inference_width:
+            inference_height = round(frame_height * self.inference_width / frame_width)
+            self.inference_size = (self.inference_width, inference_height)
+            small_shape = (inference_height, self.inference_width, channels)
+            self.small_buffer = np.empty(small_shape, dtype=np.uint8)
+        else:
+            self.inference_size = None
+            self.small_buffer = None
+            small_shape = shape
+        self.rgb_buffer = np.empty(small_shape, dtype=np.uint8)
 
     def detect_posture(self, frame):
         """
@@ -222,22 +500,63 @@ class PostureDetector:
 
         Returns:
             posture_status: 'good', 'warning', or 'bad'
-            face_size: relative size of face in frame
+            face_size: relative size of face in frame (Python float, or None)
             bbox: bounding box of detected face
             alerts: dict with alert signals (based on last 10 seconds)
         """
-        frame_height, frame_width, _ = frame.shape
-        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-
-        # Detect blinks (pass both RGB for processing and BGR for visualization)
-        self.detect_blinks(frame_rgb, frame)
-
-        # Use the pre-initialized face detection
-        results = self.face_detection.process(frame_rgb)
+        if frame.shape != self.frame_shape:
+            self._set_frame_shape(frame.shape)
+        frame_height, frame_width, _ = self.frame_shape
+
+        # MediaPipe resizes internally anyway, so shrink first and convert
+        # fewer pixels. Its outputs are relative coordinates, so the bbox
+        # and landmarks still map onto the original frame.
+        if self.inference_size is not None:
+            small = cv2.resize(frame, self.inference_size,
+                               dst=self.small_buffer, interpolation=cv2.INTER_AREA)
+        else:
+            small = frame
+
+        # Convert into a reused RGB buffer rather than a new array per frame.
+        # MediaPipe takes uint8 RGB, so this is the last pass over the pixels.
+        self.rgb_buffer.flags.writeable = True
+        frame_rgb = cv2.cvtColor(small, cv2.COLOR_BGR2RGB, dst=self.rgb_buffer)
+
+        # Read-only input lets MediaPipe's solutions wrap the buffer by
+        # reference instead of taking another copy of it
+        frame_rgb.flags.writeable = False
+
+        # Face size changes slowly, so while a face is tracked the detector
+        # only runs every frame_skip frames and the frames in between reuse
+        # its last detection. With no face, it runs on every frame, and it
+        # re-runs as soon as Face Mesh loses the face, so a stale bbox isn't
+        # reused after the user leaves.
+        self.frames_since_detect += 1
+        if (self.last_bbox is None or self.mesh_lost_face
+                or self.frames_since_detect >= self.frame_skip):
+            self.last_bbox = self.detect_face(frame_rgb)
+            self.frames_since_detect = 0
+        bbox = self.last_bbox
+
+        # Detect blinks (pass both RGB for processing and BGR for visualization).
+        # Face Mesh is the costlier model, so it's skipped when there's no
+        # face, and when the face is so small (user far from the screen)
+        # that EAR would be mostly pixel noise.
+        smoothed_size = self.get_smoothed_face_size()
+        self.frames_since_check += 1
+        if bbox is None:
+            self.mesh_lost_face = False
+        elif smoothed_size is None or smoothed_size >= self.min_blink_face_size:
+            # Only a consumed landmark result says anything about the face;
+            # with no new async result keep the previous verdict
+            if self.detect_blinks(frame_rgb, frame) is not None:
+                self.mesh_lost_face = not self.landmarks_found
+        else:
+            self.mesh_lost_face = False
+            self.far_frames_since_check += 1
 
         posture_status = 'good'
         face_size = None
-        bbox = None
         is_face_detected = False
         current_time = time.time()
 
@@ -250,14 +569,13 @@ class PostureDetector:
             'serious_eye_strain': False
         }
 
-        if results.detections:
+        if bbox is not None:
             is_face_detected = True
             self.last_face_time = current_time  # Reset face detection timer
             self.no_face_duration = 0  # Reset no-face duration
 
-            detection = results.detections[0]  # Use first detected face
-            face_size, bbox = self.calculate_face_size(detection, frame_width, frame_height)
-            self.face_size_history.append(face_size)
+            face_size = self.calculate_face_size(bbox, frame_width, frame_height)
+            self.add_face_size(face_size)
 
             smoothed_size = self.get_smoothed_face_size()
 
@@ -275,14 +593,30 @@ class PostureDetector:
             self.no_face_duration = current_time - self.last_face_time
             posture_status = 'good'
 
-        # Add current frame to rolling window
-        self.frame_history.append(posture_status)
-        self.frame_timestamps.append(current_time)
+        # Add current frame to rolling window, keeping the running counts in
+        # step with the frame that falls out of it
+        status_code = STATUS_CODES[posture_status]
+        index = self.frame_history_index
+        history_size = len(self.frame_history)
+        if self.frame_history_count == history_size:
+            evicted = self.frame_history[index]
+            if evicted == BAD_CODE:
+                self.bad_count -= 1
+            if evicted >= WARNING_CODE:
+                self.warn_or_bad_count -= 1
+        else:
+            self.frame_history_count += 1
+        self.frame_history[index] = status_code
+        self.frame_history_index = (index + 1) % history_size
+        if status_code == BAD_CODE:
+            self.bad_count += 1
+        if status_code >= WARNING_CODE:
+            self.warn_or_bad_count += 1
 
         # Calculate averages over last 10 seconds
-        bad_count = sum(1 for status in self.frame_history if status == 'bad')
-        warning_or_bad_count = sum(1 for status in self.frame_history if status in ['bad', 'warning'])
-        total_frames = len(self.frame_history)
+        bad_count = self.bad_count
+        warning_or_bad_count = self.warn_or_bad_count
+        total_frames = self.frame_history_count
 
         if total_frames > 0:
             bad_fraction = bad_count / total_frames
@@ -302,24 +636,28 @@ class PostureDetector:
 
         # Check blink rate every 60 seconds
         if current_time - self.last_blink_rate_check >= self.blink_rate_check_interval:
-            # Remove timestamps older than 60 seconds
-            cutoff_time = current_time - self.blink_rate_check_interval
-            while self.blink_timestamps and self.blink_timestamps[0] < cutoff_time:
-                self.blink_timestamps.popleft()
-
-            # Calculate blinks per minute (normalize to 60 seconds)
-            blinks_in_interval = len(self.blink_timestamps)
-            blinks_per_minute = blinks_in_interval  # Already in 60-second window
-
-            # Check if below threshold
-            if blinks_per_minute < self.absolute_min_blinks_per_minute:
+            # The check runs once per 60-second interval, so the blinks
+            # counted since the last one are the blinks per minute
+            blinks_per_minute = self.blinks_since_check
+            blinks_untracked = self.far_frames_since_check * 2 > self.frames_since_check
+            self.blinks_since_check = 0
+            self.frames_since_check = 0
+            self.far_frames_since_check = 0
+
+            # Check if below threshold; no verdict when blinks went untracked
+            # (face too far for Face Mesh) for most of the interval
+            if blinks_untracked:
+                pass
+            elif blinks_per_minute < self.absolute_min_blinks_per_minute:
                 alerts['serious_eye_strain'] = True
                 self.low_blink_rate_alert_triggered = True
-                print(f"⚠️  LOW BLINK RATE - {blinks_per_minute} blinks/min (threshold: {self.absolute_min_blinks_per_minute})")
+                logger.warning("⚠️  LOW BLINK RATE - %d blinks/min (threshold: %d)",
+                               blinks_per_minute, self.absolute_min_blinks_per_minute)
             elif blinks_per_minute < self.min_blinks_per_minute: 
                 alerts['low_blink_rate_alert'] = True
                 self.low_blink_rate_alert_triggered = True
-                print(f"⚠️  LOW BLINK RATE - {blinks_per_minute} blinks/min (threshold: {self.min_blinks_per_minute})")
+                logger.warning("⚠️  LOW BLINK RATE - %d blinks/min (threshold: %d)",
+                               blinks_per_minute, self.min_blinks_per_minute)
             else:# Reset trigger flag when blink rate recovers
                 self.low_blink_rate_alert_triggered = False
 
@@ -328,7 +666,7 @@ class PostureDetector:
         return posture_status, face_size, bbox, is_face_detected, alerts
 
     def draw_feedback(self, frame, posture_status, face_size, bbox):
-        """Draw visual feedback on frame."""
+        """Draw visual feedback on frame (for main()'s preview; the Flask service never calls this)."""
         frame_height, frame_width, _ = frame.shape
 
         # Draw status text
@@ -366,58 +704,102 @@ class PostureDetector:
 
         # Draw bounding box if face detected
         if bbox is not None:
-            x_min = int(bbox.xmin * frame_width)
-            y_min = int(bbox.ymin * frame_height)
-            x_max = int((bbox.xmin + bbox.width) * frame_width)
-            y_max = int((bbox.ymin + bbox.height) * frame_height)
+            x_min, y_min, x_max, y_max = box_to_pixels(bbox, frame_width, frame_height)
+            cv2.rectangle(frame, (x_min, y_min), (x_max, y_max), color, 3)
 
-            # Ensure coordinates are within bounds
-            x_min = max(0, x_min)
-            y_min = max(0, y_min)
-            x_max = min(frame_width, x_max)
-            y_max = min(frame_height, y_max)
+        # Draw threshold indicator bar at bottom (identical every frame, so
+        # it's rendered once and copied in)
+        bar = self._threshold_bar(frame_width)
+        frame[frame_height - bar.shape[0]:frame_height] = bar
 
-            cv2.rectangle(frame, (x_min, y_min), (x_max, y_max), color, 3)
+        return frame
+
+    def _threshold_bar(self, bar_width):
+        """Render the Good/Warning/Bad threshold bar, cached per width and threshold."""
+        key = (bar_width, self.distance_threshold)
+        if key == self.bar_cache_key:
+            return self.bar_cache
 
-        # Draw threshold indicator bar at bottom
         bar_height = 30
-        bar_width = frame_width
-        bar_y = frame_height - bar_height
+        bar = np.empty((bar_height, bar_width, 3), dtype=np.uint8)
 
         # Background
-        cv2.rectangle(frame, (0, bar_y), (bar_width, frame_height), (50, 50, 50), -1)
+        bar[:] = (50, 50, 50)
 
         # Threshold markers
         threshold_x = int(self.distance_threshold * bar_width)
         warning_x = int(self.distance_threshold * 0.75 * bar_width)
 
         # Draw zones
-        cv2.rectangle(frame, (0, bar_y), (warning_x, frame_height), (0, 255, 0), -1)
-        cv2.rectangle(frame, (warning_x, bar_y), (threshold_x, frame_height), (0, 165, 255), -1)
-        cv2.rectangle(frame, (threshold_x, bar_y), (bar_width, frame_height), (0, 0, 255), -1)
+        cv2.rectangle(bar, (0, 0), (warning_x, bar_height), (0, 255, 0), -1)
+        cv2.rectangle(bar, (warning_x, 0), (threshold_x, bar_height), (0, 165, 255), -1)
+        cv2.rectangle(bar, (threshold_x, 0), (bar_width, bar_height), (0, 0, 255), -1)
 
         # Labels
-        cv2.putText(frame, "Good", (10, frame_height - 7), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-        cv2.putText(frame, "Warning", (warning_x + 10, frame_height - 7), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 165, 255), 2)
-        cv2.putText(frame, "Bad", (threshold_x + 10, frame_height - 7), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
+        cv2.putText(bar, "Good", (10, bar_height - 7), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+        cv2.putText(bar, "Warning", (warning_x + 10, bar_height - 7), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 165, 255), 2)
+        cv2.putText(bar, "Bad", (threshold_x + 10, bar_height - 7), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
 
-        return frame
+        self.bar_cache, self.bar_cache_key = bar, key
+        return bar
 
     def alert(self, posture_status):
         """Play alert sound for bad posture."""
+        if winsound is None:
+            return
         if posture_status == 'bad' and self.bad_posture_counter >= self.bad_posture_threshold:
+            now = time.monotonic()
+            if now - self.last_beep_time < self.beep_interval:
+                return
+            self.last_beep_time = now
+
             try:
-                # Windows beep: frequency=1000Hz, duration=200ms
-                winsound.Beep(1000, 200)
+                # SND_ASYNC returns at once; the sound plays in the background
+                winsound.PlaySound('SystemAsterisk', winsound.SND_ALIAS | winsound.SND_ASYNC)
             except Exception as e:
-                print(f"Could not play sound: {e}")
+                logger.warning("Could not play sound: %s", e)
+
+
+def _detect_frames(detector, cap, results, free_frames, stop):
+    """
+    Capture and run detection on a worker thread so drawing and imshow in
+    the main loop overlap with inference. Only the newest result is kept
+    in the single-slot queue; None marks the end of capture. Frames are
+    read into buffers taken from free_frames, and go back there once the
+    display loop is done with them (or the result is dropped unseen).
+    """
+    def publish(item):
+        # Latest wins: drop a result the display loop hasn't taken yet
+        try:
+            dropped = results.get_nowait()
+            free_frames.put(dropped[0])
+        except queue.Empty:
+            pass
+        results.put(item)
+
+    # Always signal the end, even if capture or detection raises, so the
+    # display loop isn't left waiting on results.get() forever
+    try:
+        while not stop.is_set():
+            ret, frame = cap.read(free_frames.get())
+            if not ret:
+                print("Failed to grab frame")
+                break
+
+            # Flip frame in place for better selfie view
+            cv2.flip(frame, 1, dst=frame)
+
+            # Detect posture
+            publish((frame, detector.detect_posture(frame)))
+    finally:
+        publish(None)
 
 
 def main():
     print("Posture Detector - Press 'q' to quit")
     print("=" * 50)
 
-    detector = PostureDetector(distance_threshold=0.5)
+    detector = PostureDetector(distance_threshold=0.5, draw_landmarks=True)
     # Use DirectShow backend for Windows camera access
     cap = cv2.VideoCapture(0, cv2.CAP_DSHOW)
 
@@ -425,10 +807,21 @@ def main():
         print("Error: Could not open webcam")
         return
 
+    # Ask for MJPG rather than the default YUY2: half the USB bandwidth, and
+    # libjpeg-turbo decodes straight to BGR instead of a YUV->BGR pass
+    cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*'MJPG'))
+    cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
+    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+    cap.set(cv2.CAP_PROP_FPS, 30)
+
+    # Keep the driver queue short so the detector sees current frames
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+
     # Get video properties
     frame_width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
     frame_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
     fps = cap.get(cv2.CAP_PROP_FPS)
+    fourcc = int(cap.get(cv2.CAP_PROP_FOURCC)).to_bytes(4, 'little').decode('ascii', 'replace')
 
     # Use default FPS if camera doesn't report it
     if fps == 0:
@@ -436,22 +829,29 @@ def main():
 
     print(f"Camera resolution: {frame_width}x{frame_height}")
     print(f"FPS: {fps}")
+    print(f"Pixel format: {fourcc}")
     print("=" * 50)
 
     frame_count = 0
     bad_posture_time = 0
 
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            print("Failed to grab frame")
-            break
+    # Three preallocated frames circulate (one being captured, one waiting,
+    # one on screen), so capture doesn't allocate a new array every frame
+    free_frames = queue.Queue()
+    for _ in range(3):
+        free_frames.put(np.empty((frame_height, frame_width, 3), dtype=np.uint8))
 
-        # Flip frame for better selfie view
-        frame = cv2.flip(frame, 1)
+    results = queue.Queue(maxsize=1)
+    stop = threading.Event()
+    worker = threading.Thread(target=_detect_frames,
+                              args=(detector, cap, results, free_frames, stop), daemon=True)
+    worker.start()
 
-        # Detect posture
-        posture_status, face_size, bbox, is_face_detected, alerts = detector.detect_posture(frame)
+    while True:
+        item = results.get()
+        if item is None:
+            break
+        frame, (posture_status, face_size, bbox, is_face_detected, alerts) = item
 
         # Draw feedback
         frame = detector.draw_feedback(frame, posture_status, face_size, bbox)
@@ -465,8 +865,9 @@ def main():
         else:
             bad_posture_time = 0
 
-        # Display frame
+        # Display frame (imshow copies it, so the buffer can be reused)
         cv2.imshow('Posture Detector', frame)
+        free_frames.put(frame)
 
         frame_count += 1
         if frame_count % 30 == 0:  # Print stats every 30 frames
@@ -479,6 +880,8 @@ def main():
         if cv2.waitKey(1) & 0xFF == ord('q'):
             break
 
+    stop.set()
+    worker.join()
     cap.release()
     cv2.destroyAllWindows()
     print("Posture detector closed")
@@ -143,18 +143,21 @@ function startSendingFrames() {
 
     ctx.drawImage(videoEl, 0, 0);
 
-    // Convert to base64
-    const frameData = canvas.toDataURL("image/jpeg", 0.8);
+    // Encode to JPEG bytes (sent as-is, no base64/JSON wrapping)
+    const frameBlob = await new Promise((resolve) => canvas.toBlob(resolve, "image/jpeg", 0.8));
+    if (!frameBlob) {
+      return;
+    }
     if (frameCount <= 3) {
-      console.log("[SCREENCARE] Frame " + frameCount + ": " + frameData.length + " bytes (canvas: " + canvas.width + "x" + canvas.height + ")");
+      console.log("[SCREENCARE] Frame " + frameCount + ": " + frameBlob.size + " bytes (canvas: " + canvas.width + "x" + canvas.height + ")");
     }
 
     // Send to Flask backend
     try {
       const response = await fetch("http://localhost:5000/detect", {
         method: "POST",
-        headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({ frame: frameData }),
+        headers: { "Content-Type": "image/jpeg" },
+        body: frameBlob,
       });
 
       if (!response.ok) {